@@ -207,6 +207,102 @@ def bst_test_suite(n, t, insert, delete):
 	
 	return True
 
+def cache_queries(t, keys):
+	'''
+		Runs find, pred and succ on every key, and select on every rank, through the cache.
+		Returns the results.
+	'''
+	results = [(t.find(x), t.pred(x), t.succ(x)) for x in keys]
+	results += [t.select(i) for i in range(1, len(t)+1)]
+	return results
+
+def fresh_queries(t, keys):
+	'''
+		Runs the same queries as cache_queries directly on the nodes, bypassing the cache.
+	'''
+	results = [(t.recursive_find(t.root, x), t.iterative_pred(t.root, x), t.iterative_succ(t.root, x)) for x in keys]
+	results += [t.recursive_select(t.root, i) for i in range(1, len(t)+1)]
+	return results
+
+def cache_test_suite(n, cache_size):
+	'''
+		A test suite for the query cache of a BST.
+		Checks that every mutating method invalidates the cache, so stale results are never served.
+		Tests the following functions.
+		- find, pred, succ, select through the cache
+		- cache_hits, cache_misses
+		- LRU eviction (the cache never holds more than cache_size results)
+		- insert, delete, balanced_insert, split, clear (invalidation)
+	'''
+	l = [i for i in range(100, n+100)]
+	random.shuffle(l)
+	t = BST(cache_size = cache_size)
+	for x in l:
+		t.insert(x)
+
+	# Testing hits and misses. Keys in the gaps are queried too, so pred and succ differ from find.
+	keys = [i for i in range(95, n+105, 3)]
+	queries = 3 * len(keys) + len(t)
+	cache_queries(t, keys)
+	if t.cache_misses != queries or t.cache_hits != 0:
+		raise Exception (f"Error 1: Expected {queries} misses and 0 hits on a cold cache. Got {t.cache_misses} misses and {t.cache_hits} hits.")
+	if len(t.cache) > cache_size:
+		raise Exception (f"Error 2: The cache holds {len(t.cache)} results, but cache_size is {cache_size}.")
+
+	# Repeating the most recent queries should hit the cache
+	hits, misses = t.cache_hits, t.cache_misses
+	for i in range(len(t), len(t) - cache_size, -1):
+		t.select(i)
+	if t.cache_hits != hits + cache_size or t.cache_misses != misses:
+		raise Exception (f"Error 3: Repeating the {cache_size} most recent queries gave {t.cache_hits - hits} hits and {t.cache_misses - misses} misses.")
+
+	# Testing invalidation. Each mutator is applied to a tree with a full cache.
+	# The keys are checked after each one, so fresh results are never compared on lost data.
+	lset = {x for x in l}
+	mutators = [
+		("insert", lambda: t.insert(n + 100), lambda: lset.add(n + 100)),
+		("delete", lambda: t.delete(100 + n // 3), lambda: lset.remove(100 + n // 3)),
+		("balanced_insert", lambda: t.balanced_insert(99), lambda: lset.add(99)),
+	]
+	for name, mutate, expect in mutators:
+		cache_queries(t, keys)
+		mutate()
+		expect()
+		if len(t.cache) != 0:
+			raise Exception (f"Error 4: {name} did not empty the cache.")
+		if len(t) != len(lset) or [k for k, _ in t.inorder()] != sorted(lset):
+			raise Exception (f"Error 5: The keys of the tree after {name} do not match the keys that should be present.")
+		if cache_queries(t, keys) != fresh_queries(t, keys):
+			raise Exception (f"Error 6: Stale results were served after {name}.")
+
+	# Testing split. It changes the nodes of the tree it is called on.
+	cache_queries(t, keys)
+	l1, r1 = t.split(100 + n // 2)
+	for name, x, xset in [("left tree", l1, [x for x in lset if x <= 100 + n // 2]), ("right tree", r1, [x for x in lset if x > 100 + n // 2])]:
+		if len(x) != len(xset) or [k for k, _ in x.inorder()] != sorted(xset):
+			raise Exception (f"Error 7: The keys of the {name} after split do not match the keys that should be present.")
+	for name, x in [("split (original tree)", t), ("split (left tree)", l1), ("split (right tree)", r1)]:
+		if len(x.cache) != 0:
+			raise Exception (f"Error 8: {name} has cached results right after split.")
+		if cache_queries(x, keys) != fresh_queries(x, keys):
+			raise Exception (f"Error 9: Stale results were served after {name}.")
+
+	# join and balanced_delete are not tested here. Their recursive functions are still stubs.
+
+	# Testing clear
+	t = BST(cache_size = cache_size)
+	for x in l:
+		t.insert(x)
+	cache_queries(t, keys)
+	t.clear()
+	if len(t.cache) != 0:
+		raise Exception (f"Error 10: clear did not empty the cache.")
+	for x in keys:
+		if t.find(x) != (None, None) or t.pred(x) != (None, None) or t.succ(x) != (None, None):
+			raise Exception (f"Error 11: Stale results were served for {x} after clear.")
+
+	return True
+
 def bst_test_suite_wrapper(n, t, insert = None, delete = None):
 	if not insert:
 		insert = t.insert
@@ -220,7 +316,10 @@ if __name__ == "__main__":
 		n = 100
 		if bst_test_suite_wrapper(n, t, t.insert, t.delete):
 			print(f"Yay! Passed all tests for n = {n}.")
-		
+
+		if cache_test_suite(n, 16):
+			print(f"Yay! Passed all cache tests for n = {n}.")
+
 		n = 500_000
 		if bst_test_suite_wrapper(n, t, t.balanced_insert, t.balanced_delete):
 			print(f"Yay! Passed all tests for n = {n}.")
@@ -1,4 +1,5 @@
 import random
+from collections import OrderedDict
 
 class Node:
 	'''
@@ -40,15 +41,61 @@ class BST:
 		@attributes:
 			root: A pointer to the root node of the BST.
 			size: The total number of elements currently stored in the BST.
+			version: A counter that is incremented by every mutating method.
+			cache_size: The maximum number of results kept by the query cache. 0 disables the cache.
+			cache: An LRU cache of results of find, pred, succ and select, emptied whenever version changes.
+				Only hashable keys are cached. Queries on unhashable keys are always computed.
+			cache_hits, cache_misses: Counters of the lookups answered and not answered by the cache.
 	'''
-	def __init__(self, root = None):
+	def __init__(self, root = None, cache_size = 0):
 		self.root = root 
+		self.version = 0
+		self.cache_size = cache_size
+		self.cache = OrderedDict()
+		self.cache_hits = 0
+		self.cache_misses = 0
 
 	def __len__(self):
 		'''
 			This function returns the size of the BST.
 		'''
 		return self.root.size if self.root else 0
+
+	def bump_version(self):
+		'''
+			Marks the tree as modified. Called by every mutating method.
+			Empties the cache, so stale results are never served and are not kept alive.
+		'''
+		self.version += 1
+		self.cache.clear()
+
+	def cached(self, op, key, f, *args):
+		'''
+			Returns the result of the query op on key, computing it with f(*args) on a cache miss.
+			Results are stored in a bounded LRU cache keyed by (op, key).
+			If key is unhashable, f(*args) is always called.
+			Callers check cache_size first and call f directly when the cache is disabled,
+			so lookups without a cache pay nothing for it.
+		'''
+		entry = (op, key)
+		try:
+			hash(entry)
+		except TypeError:
+			# Keys only need to be ordered, not hashable, so such keys bypass the cache
+			return f(*args)
+
+		if entry in self.cache:
+			self.cache_hits += 1
+			self.cache.move_to_end(entry)
+			return self.cache[entry]
+
+		self.cache_misses += 1
+		result = f(*args)
+		self.cache[entry] = result
+		# Evict the least recently used result
+		if len(self.cache) > self.cache_size:
+			self.cache.popitem(last = False)
+		return result
 	
 	def insert(self, key, value = None):
 		'''
@@ -58,6 +105,7 @@ class BST:
 			To insert while maintaining balance, call balanced_insert.
 			This is a wrapper function that calls recursive_insert.
 		'''
+		self.bump_version()
 		self.root = self.recursive_insert(self.root, key, value)
 
 	def recursive_insert(self, x, k, v):
@@ -88,7 +136,9 @@ class BST:
 				- If the key is absent, returns (None, None)
 			This is a wrapper function that calls recursive_find.
 		'''
-		return self.recursive_find(self.root, key)
+		if self.cache_size <= 0:
+			return self.recursive_find(self.root, key)
+		return self.cached("find", key, self.recursive_find, self.root, key)
 
 	def recursive_find(self, x, k):
 		'''
@@ -166,9 +216,18 @@ class BST:
 		'''
 			Returns the largest item (key and value pair) that is smaller or equal to key
 			If no such key exists, then (None, None) is returned.
+			This is a wrapper function that calls iterative_pred.
+		'''
+		if self.cache_size <= 0:
+			return self.iterative_pred(self.root, key)
+		return self.cached("pred", key, self.iterative_pred, self.root, key)
+
+	def iterative_pred(self, r, key):
+		'''
+			Takes a Node (subtree rooted at) r, and performs the actual pred walk in its subtree for key.
 		'''
 		result = (None, None)
-		current = self.root
+		current = r
 
 		while current is not None:
 			if current.key <= key:
@@ -186,9 +245,18 @@ class BST:
 		'''
 			Returns the smallest item (key and value pair) that is greater or equal to key
 			If no such key exists, then (None, None) is returned.
+			This is a wrapper function that calls iterative_succ.
+		'''
+		if self.cache_size <= 0:
+			return self.iterative_succ(self.root, key)
+		return self.cached("succ", key, self.iterative_succ, self.root, key)
+
+	def iterative_succ(self, r, key):
+		'''
+			Takes a Node (subtree rooted at) r, and performs the actual succ walk in its subtree for key.
 		'''
 		result = (None, None)
-		current = self.root
+		current = r
 
 		while current is not None:
 			if current.key >= key:
@@ -257,6 +325,7 @@ class BST:
 			To delete while maintaining balance, call balanced_delete.
 			This is a wrapper function that calls recursive_delete.
 		'''
+		self.bump_version()
 		self.root = self.recursive_delete(self.root, key, value)
 
 	def recursive_delete(self, x, k, v):
@@ -311,7 +380,11 @@ class BST:
 				if k = n // 2: returns the median element
 			This is a wrapper function that calls recursive_select.
 		'''
-		return self.recursive_select(self.root, k)
+		# An empty tree has no root to check the size of, so check against len here
+		assert(k >= 1 and k <= len(self))
+		if self.cache_size <= 0:
+			return self.recursive_select(self.root, k)
+		return self.cached("select", k, self.recursive_select, self.root, k)
 
 	def recursive_select(self, x, k):
 		'''
@@ -320,7 +393,18 @@ class BST:
 			 - Throws an assert error if k is less than 1 or greater than n
 		'''
 		assert(k >= 1 and k <= x.size) # Keep this assert statement
-		pass
+		left_size = x.left.size if x.left else 0
+
+		# The kth smallest lies in the left subtree
+		if k <= left_size:
+			return self.recursive_select(x.left, k)
+
+		# The current node is the kth smallest
+		if k == left_size + 1:
+			return (x.key, x.value)
+
+		# Skip the left subtree and the current node
+		return self.recursive_select(x.right, k - left_size - 1)
 	
 	def inorder(self):
 		'''
@@ -335,7 +419,37 @@ class BST:
 			Performs the actual inorder traversal of the tree.
 			Returns a generator object that can be iterated over to produce the traversal.
 		'''
-		pass
+		# Base case: empty subtree produces nothing
+		if x is None:
+			return
+
+		yield from self.recursive_inorder(x.left)
+		yield (x.key, x.value)
+		yield from self.recursive_inorder(x.right)
+
+	def range(self, lo, hi):
+		'''
+			Returns the items (key and value pairs) with lo <= key <= hi, in sorted order.
+			Returns a generator object that can be iterated over.
+			This is a wrapper function that calls recursive_range.
+		'''
+		yield from self.recursive_range(self.root, lo, hi)
+
+	def recursive_range(self, x, lo, hi):
+		'''
+			Performs the actual range query, at node x.
+			Subtrees that lie entirely outside [lo, hi] are skipped.
+		'''
+		# Base case: empty subtree produces nothing
+		if x is None:
+			return
+
+		if lo < x.key:
+			yield from self.recursive_range(x.left, lo, hi)
+		if lo <= x.key <= hi:
+			yield (x.key, x.value)
+		if x.key < hi:
+			yield from self.recursive_range(x.right, lo, hi)
 
 	def split(self, key):
 		'''
@@ -343,10 +457,12 @@ class BST:
 			the split, which contains all keys <= key. The second is the right side of 
 			the split, which contains all keys > key.
 			This is a wrapper function that calls recursive_split.
+			The nodes are shared with the two new trees, so this tree is also marked as modified.
 		'''
+		self.bump_version()
 		l, r = self.recursive_split(self.root, key)
-		L = BST(l)
-		R = BST(r)
+		L = BST(l, self.cache_size)
+		R = BST(r, self.cache_size)
 		return L, R
 
 	def recursive_split(self, x, key):
@@ -354,7 +470,22 @@ class BST:
 			Performs the actual split, at node x, based on key.
 			Returns the root nodes of the two sides of the split.
 		'''
-		pass
+		# Base case: splitting an empty subtree gives two empty sides
+		if x is None:
+			return None, None
+
+		if x.key <= key:
+			# x and its left subtree belong on the left side
+			l, r = self.recursive_split(x.right, key)
+			x.right = l
+			x.update_size()
+			return x, r
+		else:
+			# x and its right subtree belong on the right side
+			l, r = self.recursive_split(x.left, key)
+			x.left = r
+			x.update_size()
+			return l, x
 
 	def join(l, r):
 		'''
@@ -367,6 +498,8 @@ class BST:
 			The result of the join is stored in the calling object, i.e., l.
 			This is a wrapper function that calls recursive_join.
 		'''
+		l.bump_version()
+		r.bump_version()
 		l.root = l.recursive_join(l.root, r.root)
 
 	def recursive_join(self, l, r):
@@ -384,6 +517,7 @@ class BST:
 			balanced with high probability.
 			This is a wrapper function that calls our recursive_balanced_insert.
 		''' 
+		self.bump_version()
 		self.root = self.recursive_balanced_insert(self.root, key, value)
 
 	def recursive_balanced_insert(self, x, k, v):
@@ -395,7 +529,24 @@ class BST:
 			comparison with the root.
 			With probability 1 / (size of the tree + 1), the new key is inserted at the root (by calling split)
 		'''
-		pass
+		# Base case: if x is None, create a new node
+		if x is None:
+			return Node(k, v)
+
+		# With probability 1 / (n + 1), the new key becomes the root of this subtree
+		if random.randrange(x.size + 1) == 0:
+			l, r = self.recursive_split(x, k)
+			return Node(k, v, l, r)
+
+		# Recursive case: insert in left or right subtree
+		if k < x.key:
+			x.left = self.recursive_balanced_insert(x.left, k, v)
+		else:
+			x.right = self.recursive_balanced_insert(x.right, k, v)
+
+		# Update size after insertion
+		x.update_size()
+		return x
 
 	def balanced_delete(self, key, value = None):
 		'''
@@ -407,6 +558,7 @@ class BST:
 			smaller tree. So this operation is always O(log n).
 			This is a wrapper function that calls recursive_balanced_delete.
 		'''
+		self.bump_version()
 		self.root = self.recursive_balanced_delete(self.root, key, value)
 
 	def recursive_balanced_delete(self, x, k, v):
@@ -421,6 +573,7 @@ class BST:
 			This is performed using a postorder traversal.
 			This is a wrapper function that calls recursive_clear.
 		'''
+		self.bump_version()
 		self.recursive_clear(self.root)
 		self.root = None
 	
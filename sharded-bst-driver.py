@@ -0,0 +1,121 @@
+import traceback
+import random
+from bisect import bisect_left
+from sharded_bst import ShardedBST
+
+def sharded_bst_test_suite(n, shards):
+	'''
+		A test suite for ShardedBST.
+		Tests the following functions.
+		- insert_many
+		- find_many
+		- range
+		- select
+		- len
+		- rebalance (after forcing skew)
+		- shard_sizes
+	'''
+	l = [i for i in range(100, n+100)]
+	random.shuffle(l)
+
+	# All keys land in the last shard, so the tree starts out skewed.
+	# rebalance_every = 0 so insert_many does not fix the skew before we check it.
+	with ShardedBST([i for i in range(1, shards)], rebalance_every = 0) as t:
+		# Testing insert_many and find_many
+		for i in range(0, n, 1000):
+			t.insert_many([(x, x * 2) for x in l[i:i+1000]])
+		if len(t) != n:
+			raise Exception (f"Error 1: The size of the sharded tree is {len(t)}, but {n} keys were inserted.")
+		found = t.find_many(l + [n+100, 99])
+		expected = [(x, x * 2) for x in l] + [(None, None), (None, None)]
+		for (k, v), (x, y) in zip(found, expected):
+			if k != x or v != y:
+				raise Exception (f"Error 2: find_many returned ({k}, {v}), but ({x}, {y}) was expected.")
+
+		# Forcing skew
+		sizes = t.shard_sizes()
+		if not t.is_skewed(sizes):
+			raise Exception (f"Error 3: Shard sizes {sizes} should be reported as skewed.")
+
+		for phase in ["before rebalance", "after rebalance"]:
+			lsorted = sorted(l)
+
+			# Testing range
+			lo, hi = 100 + n // 3, 100 + 2 * n // 3
+			keys = [k for k, _ in t.range(lo, hi)]
+			if keys != [x for x in lsorted if lo <= x <= hi]:
+				raise Exception (f"Error 4: range({lo}, {hi}) {phase} did not return the keys in that range in order.")
+			keys = [k for k, _ in t.range(0, n+200)]
+			if keys != lsorted:
+				raise Exception (f"Error 5: range over every key {phase} does not match the inserted keys.")
+
+			# Testing select
+			for i in [1, n // 4, n // 2, n - 1, n]:
+				k, _ = t.select(i)
+				if k != lsorted[i-1]:
+					raise Exception (f"Error 6: select({i}) {phase} returned {k}, when it should have returned {lsorted[i-1]}.")
+
+			if phase == "before rebalance":
+				# Testing rebalance
+				if not t.rebalance():
+					raise Exception (f"Error 7: rebalance did not move any boundaries for shard sizes {sizes}.")
+
+		# Checking shard sizes after rebalance
+		sizes = t.shard_sizes()
+		if sum(sizes) != n or max(sizes) - min(sizes) > 1:
+			raise Exception (f"Error 8: Shard sizes after rebalance are {sizes}. Expected {n // shards} keys in each shard.")
+		if t.is_skewed(sizes):
+			raise Exception (f"Error 9: Shard sizes {sizes} are still skewed after rebalance.")
+
+		# Checking that each shard holds exactly the keys its boundaries say it owns
+		bounds = [None] + t.boundaries + [None]
+		for i in range(shards):
+			owned = [x for x in lsorted if bisect_left(t.boundaries, x) == i]
+			if len(owned) != sizes[i]:
+				raise Exception (f"Error 10: Shard {i} holds {sizes[i]} keys, but owns {len(owned)} keys between {bounds[i]} and {bounds[i+1]}.")
+			if owned and [k for k, _ in t.range(owned[0], owned[-1])] != owned:
+				raise Exception (f"Error 11: Shard {i} does not hold exactly the keys between {bounds[i]} and {bounds[i+1]}.")
+
+		# A second rebalance has nothing to move
+		if t.rebalance():
+			raise Exception (f"Error 12: rebalance moved boundaries on shards that were already balanced.")
+
+	return True
+
+def sorted_load_test_suite(n, shards):
+	'''
+		Bulk loads keys 0 to n-1 in ascending order, in batches, into a ShardedBST.
+		Ascending keys degenerate an unbalanced BST into a list, so this checks that the shards
+		stay shallow enough for insert, split and inorder, and that insert_many rebalances the
+		shards on its own as they become skewed.
+	'''
+	with ShardedBST([1000 * i for i in range(1, shards)]) as t:
+		for i in range(0, n, 1000):
+			t.insert_many([(x, None) for x in range(i, min(i + 1000, n))])
+		if len(t) != n:
+			raise Exception (f"Error 13: The size of the sharded tree is {len(t)}, but {n} sorted keys were inserted.")
+		found = t.find_many([x for x in range(n)])
+		for x, (k, _) in zip(range(n), found):
+			if k != x:
+				raise Exception (f"Error 14: {x} is not present after a sorted bulk load.")
+		keys = [k for k, _ in t.range(0, n)]
+		if keys != [x for x in range(n)]:
+			raise Exception (f"Error 15: range over every key does not match the sorted keys that were inserted.")
+		sizes = t.shard_sizes()
+		if t.is_skewed(sizes):
+			raise Exception (f"Error 16: Shard sizes {sizes} are still skewed after a sorted bulk load.")
+
+	return True
+
+if __name__ == "__main__":
+	try:
+		n, shards = 20_000, 4
+		if sharded_bst_test_suite(n, shards):
+			print(f"Yay! Passed all tests for n = {n} with {shards} shards.")
+
+		if sorted_load_test_suite(n, shards):
+			print(f"Yay! Passed sorted bulk load tests for n = {n} with {shards} shards.")
+
+	except Exception as e:
+		print(e)
+		print(traceback.print_exc())
@@ -0,0 +1,356 @@
+import sys
+import time
+import pickle
+import random
+from bisect import bisect_left
+from multiprocessing import Pipe, Process, cpu_count
+from bst import BST
+
+def shard_worker(conn):
+	'''
+		Runs inside a worker process and owns exactly one BST (one shard).
+		Receives (command, args) messages on conn and sends back one reply per message.
+		Each reply is ("ok", result), or ("error", exception) if the command raised an exception.
+		The worker keeps running after an error. Items applied before the error stay in the shard.
+		Supported commands:
+			- insert: args is a list of (key, value) items. Replies None.
+				Items are inserted with balanced_insert, so sorted input does not degenerate the tree.
+			- find: args is a list of keys. Replies a list of items, one per key.
+			- range: args is (lo, hi). Replies all items with lo <= key <= hi, in order.
+			- select: args is k. Replies the kth smallest item of the shard.
+			- retain: args is (lo, hi). Keeps only keys in (lo, hi] and replies the removed items.
+			- len: Replies the size of the shard.
+			- close: Replies None and stops the worker.
+	'''
+	t = BST()
+	while True:
+		command, args = conn.recv()
+		try:
+			reply = None
+			if command == "insert":
+				for k, v in args:
+					t.balanced_insert(k, v)
+			elif command == "find":
+				reply = [t.find(k) for k in args]
+			elif command == "range":
+				lo, hi = args
+				reply = list(t.range(lo, hi))
+			elif command == "select":
+				reply = t.select(args)
+			elif command == "retain":
+				lo, hi = args
+				reply = []
+				# Keys > hi belong to a later shard
+				if hi is not None:
+					l, r = t.split(hi)
+					reply.extend(r.inorder())
+					t = l
+				# Keys <= lo belong to an earlier shard
+				if lo is not None:
+					l, r = t.split(lo)
+					reply.extend(l.inorder())
+					t = r
+			elif command == "len":
+				reply = len(t)
+			elif command == "close":
+				conn.send(("ok", None))
+				conn.close()
+				return
+			else:
+				raise ValueError(f"Unknown shard command {command!r}")
+		except Exception as e:
+			send_error(conn, e)
+		else:
+			conn.send(("ok", reply))
+
+def send_error(conn, e):
+	'''
+		Sends exception e back to the parent as an error reply.
+		If e cannot be pickled, a RuntimeError with its description is sent instead.
+	'''
+	try:
+		conn.send(("error", e))
+	except Exception:
+		conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+
+class ShardedBST:
+	'''
+		A BST whose key space is partitioned into contiguous ranges, one range per worker process.
+		Each worker owns one BST, so batched operations on different shards run on different cores.
+		@attributes:
+			workers: The worker processes, one per shard.
+			conns: The pipe ends used to talk to each worker, in shard order.
+			boundaries: A sorted list of len(workers) - 1 keys. Shard i owns every key k with
+				boundaries[i-1] < k <= boundaries[i] (the first and last shards are unbounded).
+				This matches split, which puts keys <= key on the left side.
+			skew: Rebalance is triggered when the largest shard holds more than skew times
+				the average shard size.
+			rebalance_every: insert_many checks for skew (and rebalances if needed) after every
+				rebalance_every batches. 0 disables the check, and the caller must then call
+				rebalance_if_skewed itself.
+			batches: The number of insert_many batches since the last skew check.
+	'''
+	def __init__(self, boundaries, skew = 2.0, rebalance_every = 10):
+		self.boundaries = sorted(boundaries)
+		self.skew = skew
+		self.rebalance_every = rebalance_every
+		self.batches = 0
+		self.workers = []
+		self.conns = []
+		for _ in range(len(self.boundaries) + 1):
+			parent_conn, child_conn = Pipe()
+			p = Process(target = shard_worker, args = (child_conn,), daemon = True)
+			p.start()
+			child_conn.close()
+			self.workers.append(p)
+			self.conns.append(parent_conn)
+
+	def __len__(self):
+		'''
+			Returns the total number of elements across all shards.
+		'''
+		return sum(self.shard_sizes())
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def shard_of(self, key):
+		'''
+			Returns the index of the shard that owns key.
+		'''
+		return bisect_left(self.boundaries, key)
+
+	def broadcast(self, messages):
+		'''
+			Sends messages, a dict of shard index -> (command, args), to the owning workers.
+			All messages are sent before any reply is awaited, so the shards work in parallel.
+			Returns a dict of shard index -> reply.
+			Every reply is collected before anything is raised, so the pipes stay in step.
+			If a worker raised an exception, the first such exception is re-raised here.
+			If a worker has died, a RuntimeError is raised.
+		'''
+		sent = []
+		errors = []
+		for i, message in messages.items():
+			try:
+				self.conns[i].send(message)
+				sent.append(i)
+			except OSError:
+				errors.append(RuntimeError(f"Shard {i} worker has stopped"))
+
+		replies = {}
+		for i in sent:
+			try:
+				status, reply = self.conns[i].recv()
+			except (EOFError, OSError):
+				errors.append(RuntimeError(f"Shard {i} worker has stopped"))
+				continue
+			if status == "error":
+				errors.append(reply)
+			else:
+				replies[i] = reply
+
+		if errors:
+			raise errors[0]
+		return replies
+
+	def shard_sizes(self):
+		'''
+			Returns a list with the number of elements held by each shard.
+		'''
+		replies = self.broadcast({i: ("len", None) for i in range(len(self.conns))})
+		return [replies[i] for i in range(len(self.conns))]
+
+	def insert_many(self, items):
+		'''
+			Inserts a batch of (key, value) items. Each item is routed to the shard that owns its key,
+			and the shards insert their part of the batch in parallel.
+			Every rebalance_every batches, calls rebalance_if_skewed.
+			This is a wrapper function that calls route_insert.
+		'''
+		self.route_insert(items)
+		if self.rebalance_every > 0:
+			self.batches += 1
+			if self.batches >= self.rebalance_every:
+				self.batches = 0
+				self.rebalance_if_skewed()
+
+	def route_insert(self, items):
+		'''
+			Performs the actual insert of a batch of items, routing each item to its owning shard.
+		'''
+		batches = {}
+		for k, v in items:
+			batches.setdefault(self.shard_of(k), []).append((k, v))
+		self.broadcast({i: ("insert", batch) for i, batch in batches.items()})
+
+	def find_many(self, keys):
+		'''
+			Finds a batch of keys. Returns a list of items in the same order as keys.
+			Each item is (key, value) if the key is present, else (None, None), as in BST.find.
+		'''
+		batches = {}
+		for pos, k in enumerate(keys):
+			batches.setdefault(self.shard_of(k), []).append(pos)
+		replies = self.broadcast({i: ("find", [keys[pos] for pos in positions]) for i, positions in batches.items()})
+		result = [None] * len(keys)
+		for i, positions in batches.items():
+			for pos, item in zip(positions, replies[i]):
+				result[pos] = item
+		return result
+
+	def range(self, lo, hi):
+		'''
+			Returns a list of every item (key and value pair) with lo <= key <= hi, in sorted order.
+			Only the shards whose ranges overlap [lo, hi] are queried.
+		'''
+		if hi < lo:
+			return []
+		first, last = self.shard_of(lo), self.shard_of(hi)
+		replies = self.broadcast({i: ("range", (lo, hi)) for i in range(first, last + 1)})
+		result = []
+		for i in range(first, last + 1):
+			result.extend(replies[i])
+		return result
+
+	def select(self, k):
+		'''
+			Returns the kth smallest item (key and value pair) across all shards.
+			Constraints: 1 <= k <= n
+			 - Throws an assert error if k is less than 1 or greater than n
+		'''
+		return self.select_with_sizes(k, self.shard_sizes())
+
+	def select_with_sizes(self, k, sizes):
+		'''
+			Performs the actual select, given the current shard sizes.
+			Finds the shard holding the kth smallest item, then calls select on that shard only.
+		'''
+		assert(k >= 1 and k <= sum(sizes))
+		for i, size in enumerate(sizes):
+			if k <= size:
+				return self.broadcast({i: ("select", k)})[i]
+			k -= size
+
+	def is_skewed(self, sizes = None):
+		'''
+			Returns True if the largest shard holds more than skew times the average shard size.
+		'''
+		if sizes is None:
+			sizes = self.shard_sizes()
+		total = sum(sizes)
+		return total > 0 and max(sizes) > self.skew * total / len(sizes)
+
+	def rebalance(self, sizes = None):
+		'''
+			Moves shard boundaries so that every shard holds about the same number of elements.
+			The new boundaries are the keys of rank n * i / (number of shards), found with select.
+			Each shard then splits off the keys it no longer owns, and those keys are inserted
+			into their new owning shards.
+			Returns True if the boundaries moved. If a key is duplicated so heavily that the new
+			boundaries equal the old ones, no data is moved and False is returned.
+		'''
+		if sizes is None:
+			sizes = self.shard_sizes()
+		n = sum(sizes)
+		shards = len(self.conns)
+		if n < shards:
+			return False
+		boundaries = [self.select_with_sizes(n * i // shards, sizes)[0] for i in range(1, shards)]
+		if boundaries == self.boundaries:
+			return False
+		self.boundaries = boundaries
+
+		# Every shard keeps only the keys in its new range, in parallel
+		bounds = [None] + self.boundaries + [None]
+		replies = self.broadcast({i: ("retain", (bounds[i], bounds[i+1])) for i in range(shards)})
+		moved = [item for i in range(shards) for item in replies[i]]
+		self.route_insert(moved)
+		return True
+
+	def rebalance_if_skewed(self):
+		'''
+			Calls rebalance if the shards have become skewed. Returns True if a rebalance happened.
+		'''
+		sizes = self.shard_sizes()
+		if self.is_skewed(sizes):
+			return self.rebalance(sizes)
+		return False
+
+	def close(self):
+		'''
+			Stops every worker process. The shards and their contents are discarded.
+			Workers that have died are skipped, and workers that do not stop are terminated.
+		'''
+		if not self.workers:
+			return
+		for p, conn in zip(self.workers, self.conns):
+			if not p.is_alive():
+				continue
+			try:
+				conn.send(("close", None))
+				conn.recv()
+			except (EOFError, OSError):
+				pass
+		for p in self.workers:
+			p.join(timeout = 1)
+			if p.is_alive():
+				p.terminate()
+				p.join()
+		for conn in self.conns:
+			conn.close()
+		self.workers = []
+		self.conns = []
+
+def even_boundaries(lo, hi, shards):
+	'''
+		Returns shards - 1 boundaries that split the integer key range [lo, hi) into equal parts.
+	'''
+	return [lo + (hi - lo) * i // shards - 1 for i in range(1, shards)]
+
+def throughput(n, shards, batch = 10_000):
+	'''
+		Inserts n random integer keys into a ShardedBST with the given number of shards,
+		then finds all of them, in batches.
+		Returns the throughput (operations per second) of the inserts, of the finds, and of the
+		parent-side routing alone (a bisect per key plus pickling the per-shard batches).
+		Routing runs serially in the parent, so it bounds how far inserts and finds can scale.
+	'''
+	keys = random.sample(range(n * 10), n)
+	with ShardedBST(even_boundaries(0, n * 10, shards)) as t:
+		start = time.perf_counter()
+		for i in range(0, n, batch):
+			t.insert_many([(k, None) for k in keys[i:i+batch]])
+		insert_time = time.perf_counter() - start
+
+		start = time.perf_counter()
+		for i in range(0, n, batch):
+			t.find_many(keys[i:i+batch])
+		find_time = time.perf_counter() - start
+
+		start = time.perf_counter()
+		for i in range(0, n, batch):
+			batches = {}
+			for k in keys[i:i+batch]:
+				batches.setdefault(t.shard_of(k), []).append((k, None))
+			pickle.dumps(batches)
+		route_time = time.perf_counter() - start
+	return n / insert_time, n / find_time, n / route_time
+
+if __name__ == "__main__":
+	# Reports insert and find throughput for 1 to N shards, each relative to 1 shard.
+	# The parent routes every key and pickles every batch serially, so the speedup depends on
+	# that routing cost (shown in the last column) and is well below linear in the core count.
+	# Usage: python sharded_bst.py [n] [max shards]
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+	max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else cpu_count()
+	base_ins = base_fnd = None
+	print(f"{'shards':>6} {'insert ops/s':>14} {'speedup':>8} {'find ops/s':>14} {'speedup':>8} {'routing ops/s':>14}")
+	for shards in range(1, max_shards + 1):
+		ins, fnd, route = throughput(n, shards)
+		if base_ins is None:
+			base_ins, base_fnd = ins, fnd
+		print(f"{shards:>6} {ins:>14,.0f} {ins / base_ins:>7.2f}x {fnd:>14,.0f} {fnd / base_fnd:>7.2f}x {route:>14,.0f}")